@@ -8,7 +8,6 @@ from typing import Optional
 import os
 from dotenv import load_dotenv
 
-from .ui.tui_main import DocSearchApp
 from .core.ripgrep_wrapper import RipgrepWrapper
 
 
@@ -36,6 +35,7 @@ def main(path: Optional[str], regex: bool, type: tuple, index: bool, version: bo
     if index:
         click.echo("🌟 セマンティック検索用のインデックスを構築します...")
         from .core.semantic_search import SemanticSearchEngine
+        from .core.file_collector import iter_documents, iter_files
         
         # OpenAI使用判定
         use_openai = os.getenv("USE_OPENAI_EMBEDDINGS", "false").lower() == "true"
@@ -43,30 +43,27 @@ def main(path: Optional[str], regex: bool, type: tuple, index: bool, version: bo
         engine = SemanticSearchEngine(use_openai=use_openai)
         
         # ドキュメントを収集（パッケージディレクトリを除外）
-        documents = []
-        for pattern in ['**/*.md', '**/*.py', '**/*.txt']:
-            for file_path in search_path.glob(pattern):
-                # パッケージディレクトリを除外
-                if any(part.startswith('.') or part in ['__pycache__', 'node_modules', 'env', 'venv'] 
-                       for part in file_path.parts):
-                    continue
-                # パッケージファイルを除外（site-packagesなど）
-                if 'site-packages' in str(file_path) or str(file_path).endswith('-env'):
-                    continue
-                try:
-                    content = file_path.read_text(encoding='utf-8', errors='ignore')
-                    documents.append((str(file_path), content))
-                except Exception:
-                    pass
+        paths = []
+        for file_path in iter_files(search_path):
+            # パッケージディレクトリを除外
+            if any(part.startswith('.') or part in ['__pycache__', 'node_modules', 'env', 'venv'] 
+                   for part in file_path.parts):
+                continue
+            # パッケージファイルを除外（site-packagesなど）
+            if 'site-packages' in str(file_path) or str(file_path).endswith('-env'):
+                continue
+            paths.append(file_path)
         
-        click.echo(f"📄 {len(documents)}個のドキュメントを発見")
+        click.echo(f"📄 {len(paths)}個のドキュメントを発見")
         
-        # インデックス構築
-        engine.build_index(documents)
+        # インデックス構築（ファイルは並列に先読みしながら1つずつ処理）
+        engine.build_index(iter_documents(paths))
         click.echo("✅ インデックス構築完了！")
         return
     
-    # TUIアプリケーションの起動
+    # TUIアプリケーションの起動（textualはTUIを開くときだけ読み込む）
+    from .ui.tui_main import DocSearchApp
+    
     app = DocSearchApp(
         search_path=search_path,
         use_regex=regex,
@@ -0,0 +1,130 @@
+"""
+ファイル収集ユーティリティ - 検索・インデックス対象ファイルの読み込み
+"""
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, Tuple
+import logging
+import os
+
+import pathspec
+
+logger = logging.getLogger(__name__)
+
+# ファイル読み込みはI/O待ちが支配的なので、CPU数より多いスレッドで重ねる
+DEFAULT_READ_WORKERS = 32
+
+# 検索・インデックス対象のデフォルト拡張子
+DEFAULT_EXTENSIONS = ('.md', '.py', '.txt')
+
+# 走査しないディレクトリ（ripgrepと同様に生成物・依存パッケージを飛ばす）
+SKIP_DIRS = frozenset({'.git', 'node_modules', '.venv', '__pycache__', 'dist', 'build'})
+
+# これより大きいファイルは生成物とみなして対象外にする
+MAX_FILE_SIZE = 5 * 1024 * 1024
+
+
+def extensions_for(file_types: Optional[Iterable[str]]) -> Tuple[str, ...]:
+    """ファイルタイプ指定（例: py, md）を拡張子のタプルに変換"""
+    if not file_types:
+        return DEFAULT_EXTENSIONS
+    return tuple(f'.{file_type}' for file_type in file_types)
+
+
+def _load_gitignore(root: Path) -> Optional[pathspec.GitIgnoreSpec]:
+    """ルートの.gitignoreを読み込む（なければNone）"""
+    gitignore = root / '.gitignore'
+    try:
+        with open(gitignore, 'r', encoding='utf-8', errors='ignore') as f:
+            return pathspec.GitIgnoreSpec.from_lines(f)
+    except OSError:
+        return None
+
+
+def iter_files(
+    root: Path,
+    extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+    max_file_size: Optional[int] = MAX_FILE_SIZE
+) -> Iterator[Path]:
+    """
+    ディレクトリを1回だけ走査して、指定拡張子のファイルを列挙
+    
+    拡張子ごとにrglobすると同じツリーを何度も走査するため、
+    os.walkの1パスで拡張子を判定する。SKIP_DIRSのディレクトリと
+    ルートの.gitignoreに一致するパスは走査の段階で除外する。
+    
+    Args:
+        root: 走査するディレクトリ
+        extensions: 対象の拡張子（例: '.md'）
+        max_file_size: これより大きいファイルを除外（Noneなら制限なし）
+        
+    Yields:
+        条件に合うファイルのパス
+    """
+    extensions = frozenset(extensions)
+    ignore = _load_gitignore(Path(root))
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root).replace(os.sep, '/')
+        prefix = '' if rel_dir == '.' else rel_dir + '/'
+        
+        # 除外ディレクトリはその場で取り除いて、配下を走査しない
+        dirnames[:] = [
+            name for name in dirnames
+            if name not in SKIP_DIRS
+            and not (ignore is not None and ignore.match_file(f'{prefix}{name}/'))
+        ]
+        
+        for name in filenames:
+            if os.path.splitext(name)[1] not in extensions:
+                continue
+            if ignore is not None and ignore.match_file(prefix + name):
+                continue
+            file_path = os.path.join(dirpath, name)
+            if max_file_size is not None:
+                try:
+                    if os.stat(file_path).st_size > max_file_size:
+                        continue
+                except OSError:
+                    continue
+            yield Path(file_path)
+
+
+def _read_safe(path: Path) -> Optional[Tuple[str, str]]:
+    """ファイルを読み込む（失敗時はNone）"""
+    try:
+        return str(path), path.read_text(encoding='utf-8', errors='ignore')
+    except Exception as e:
+        logger.debug(f"ファイル読み込みエラー: {path} - {e}")
+        return None
+
+
+def iter_documents(
+    paths: Iterable[Path],
+    max_workers: int = DEFAULT_READ_WORKERS
+) -> Iterator[Tuple[str, str]]:
+    """
+    複数ファイルをスレッドプールで先読みしながら順に返す
+    
+    先読みするファイル数を制限するので、全ファイルの内容を
+    同時にメモリへ載せずに済む。
+    
+    Args:
+        paths: 読み込むファイルのパス
+        max_workers: 読み込みスレッド数
+        
+    Yields:
+        (file_path, content) のタプル（読み込めなかったファイルは除外）
+    """
+    pending: "deque[Future]" = deque()
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for path in paths:
+            pending.append(executor.submit(_read_safe, path))
+            if len(pending) >= max_workers * 2:
+                document = pending.popleft().result()
+                if document is not None:
+                    yield document
+        while pending:
+            document = pending.popleft().result()
+            if document is not None:
+                yield document
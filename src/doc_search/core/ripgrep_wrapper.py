@@ -1,24 +1,108 @@
 """
 ripgrep ラッパー - 高速検索エンジンとの統合
 """
-import json
+import base64
+import mmap
+import os
 import subprocess
 import shutil
+import threading
+import time
 from pathlib import Path
-from typing import List, Dict, Optional, Iterator, Union
+from typing import AnyStr, List, Dict, Optional, Generator, Iterator, Union, Tuple, Pattern, cast
 from dataclasses import dataclass
 from functools import lru_cache
 import re
 import logging
 
+import orjson
+
+try:
+    # google-re2: バックトラックしないDFAベースの正規表現エンジン（任意依存）
+    import re2
+except ImportError:
+    re2 = None
+
 from .errors import SearchError, RipgrepNotFoundError, retry
+from .file_collector import extensions_for, iter_files
 
 logger = logging.getLogger(__name__)
 
+# ripgrepの出力を読み込むバッファサイズ
+_RG_READ_BUFFER_SIZE = 1 << 20
+
+# ripgrepのJSON出力でマッチを表す行の先頭（typeが必ず最初に出力される）
+_RG_MATCH_PREFIX = b'{"type":"match"'
+
+
+def _rg_text(data: Dict[str, str]) -> str:
+    """
+    ripgrepのJSON出力のテキスト値を取り出す
+    
+    UTF-8として不正なパスや行は {"bytes": base64} で出力されるので、
+    デコードできない部分を置換して文字列にする。
+    """
+    text = data.get('text')
+    if text is not None:
+        return text
+    return base64.b64decode(data['bytes']).decode('utf-8', errors='replace')
+
+
+def _char_offset(line: bytes, byte_offset: int) -> int:
+    """行頭からのバイト位置を文字位置に変換（デコードできないバイトは数えない）"""
+    return len(line[:byte_offset].decode('utf-8', errors='ignore'))
+
+
+# RE2で再現できるreのフラグ
+# （RE2の \w や \b は元からASCIIのみなのでASCIIも扱えるが、大文字小文字の同一視は
+#   常にUnicode全体で行うため、ASCIIとIGNORECASEの組み合わせは標準のreで処理する）
+_RE2_SUPPORTED_FLAGS = re.IGNORECASE | re.MULTILINE | re.DOTALL | re.ASCII
+
+
+def _compile_re2(pattern: AnyStr, flags: int) -> Optional[Pattern]:
+    """RE2で正規表現をコンパイル（RE2が使えない・未対応の構文ならNone）"""
+    if re2 is None or flags & ~_RE2_SUPPORTED_FLAGS:
+        return None
+    if flags & re.ASCII and flags & re.IGNORECASE:
+        return None
+        
+    options = re2.Options()
+    options.log_errors = False
+    options.case_sensitive = not flags & re.IGNORECASE
+    options.dot_nl = bool(flags & re.DOTALL)
+    if flags & re.MULTILINE:
+        pattern = (b'(?m)' if isinstance(pattern, bytes) else '(?m)') + pattern
+    try:
+        # RE2の正規表現オブジェクトはreのPatternと同じインターフェースを持つ
+        return cast(Pattern, re2.compile(pattern, options))
+    except re2.error:
+        # 後方参照や先読みなどRE2が対応していない構文
+        return None
+
+
+@lru_cache(maxsize=256)
+def _compile(pattern: AnyStr, flags: int) -> Pattern:
+    """
+    正規表現をコンパイル（同じクエリの再コンパイルを避けるためキャッシュ）
+    
+    google-re2がインストールされていればRE2を優先し、
+    RE2で扱えないパターンは標準のreにフォールバックする。
+    """
+    compiled = _compile_re2(pattern, flags)
+    if compiled is not None:
+        return compiled
+    return re.compile(pattern, flags)
+
 
 @dataclass
 class SearchResult:
-    """検索結果を表すデータクラス"""
+    """
+    検索結果を表すデータクラス
+    
+    match_start/match_endはline_content内の文字位置
+    （ripgrepとPythonフォールバックのどちらで検索しても
+    line_content[match_start:match_end]が一致した部分になる）。
+    """
     file_path: str
     line_number: int
     line_content: str
@@ -34,11 +118,55 @@ class SearchOptions:
     file_types: Optional[List[str]] = None
     max_results: Optional[int] = None
     context_lines: int = 0
+    # Pythonフォールバックで大文字小文字をUnicode全体で同一視するか
+    # （Falseなら高速なASCIIのみの比較）
+    unicode: bool = False
+    # ripgrepの検索スレッド数（Noneなら論理CPU数）
+    threads: Optional[int] = None
+    # メモリマップ読み込みを使うか（ripgrepとPythonフォールバックの両方）
+    mmap: bool = False
+
+
+class SearchCancelEvent(threading.Event):
+    """
+    検索の中断フラグ
+    
+    セットすると実行中のripgrepプロセスをその場で終了させる
+    （検索スレッドが出力の読み取りで待っていても中断できる）。
+    """
+    
+    def __init__(self) -> None:
+        super().__init__()
+        self._process_lock = threading.Lock()
+        self._process: Optional[subprocess.Popen] = None
+        
+    def set(self) -> None:
+        with self._process_lock:
+            super().set()
+            if self._process is not None and self._process.poll() is None:
+                self._process.kill()
+                
+    def attach(self, process: subprocess.Popen) -> None:
+        """実行中のripgrepプロセスを登録（既に中断されていればすぐに終了させる）"""
+        with self._process_lock:
+            if self.is_set():
+                process.kill()
+            else:
+                self._process = process
+                
+    def detach(self) -> None:
+        """終了したripgrepプロセスの登録を外す"""
+        with self._process_lock:
+            self._process = None
 
 
 class RipgrepWrapper:
     """ripgrepの機能をラップするクラス"""
     
+    # Pythonフォールバックのファイル一覧キャッシュの有効期間（秒）
+    # （新しく作成・リネームされたファイルはこの間隔で検索対象に反映される）
+    FILE_LIST_TTL = 5.0
+    
     def __init__(self, fallback_to_python: bool = True):
         """
         Args:
@@ -46,6 +174,8 @@ class RipgrepWrapper:
         """
         self.fallback_to_python = fallback_to_python
         self._ripgrep_available = self._check_ripgrep()
+        # Pythonフォールバック用の検索対象ファイル一覧キャッシュ（取得時刻と一覧）
+        self._file_list_cache: Dict[Tuple[Path, Tuple[str, ...]], Tuple[float, List[Path]]] = {}
         
     @staticmethod
     @lru_cache(maxsize=1)
@@ -57,8 +187,9 @@ class RipgrepWrapper:
         self, 
         query: str, 
         path: Union[str, Path], 
-        options: Optional[SearchOptions] = None
-    ) -> Iterator[SearchResult]:
+        options: Optional[SearchOptions] = None,
+        cancel_event: Optional[SearchCancelEvent] = None
+    ) -> Generator[SearchResult, None, None]:
         """
         指定されたパスで検索を実行
         
@@ -66,6 +197,7 @@ class RipgrepWrapper:
             query: 検索クエリ
             path: 検索対象のパス
             options: 検索オプション
+            cancel_event: セットされたら検索を中断する（ripgrepプロセスも終了させる）
             
         Yields:
             SearchResult: 検索結果
@@ -76,10 +208,10 @@ class RipgrepWrapper:
         path = Path(path)
         
         if self._ripgrep_available:
-            yield from self._search_with_ripgrep(query, path, options)
+            yield from self._search_with_ripgrep(query, path, options, cancel_event)
         elif self.fallback_to_python:
             logger.warning("ripgrepが見つかりません。Pythonフォールバックを使用します。")
-            yield from self._search_with_python(query, path, options)
+            yield from self._search_with_python(query, path, options, cancel_event)
         else:
             raise RuntimeError("ripgrepが利用できません")
             
@@ -88,10 +220,11 @@ class RipgrepWrapper:
         self, 
         query: str, 
         path: Path, 
-        options: SearchOptions
-    ) -> Iterator[SearchResult]:
+        options: SearchOptions,
+        cancel_event: Optional[SearchCancelEvent] = None
+    ) -> Generator[SearchResult, None, None]:
         """ripgrepを使用して検索（リトライ機能付き）"""
-        cmd = ['rg', '--json']
+        cmd = ['rg', '--json', '--no-messages']
         
         # オプションの設定
         if not options.case_sensitive:
@@ -105,42 +238,70 @@ class RipgrepWrapper:
         if options.file_types:
             for file_type in options.file_types:
                 cmd.extend(['-t', file_type])
+        # スレッド数を明示（未指定なら論理CPU数）
+        cmd.extend(['-j', str(options.threads or os.cpu_count() or 1)])
+        if options.mmap:
+            cmd.append('--mmap')
                 
         cmd.extend([query, str(path)])
         
         try:
-            # ripgrepを実行
+            # ripgrepを実行（デコードせずバイト列のまま受け取る）
             process = subprocess.Popen(
                 cmd,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                text=True,
-                bufsize=1
+                stderr=subprocess.DEVNULL,
+                bufsize=_RG_READ_BUFFER_SIZE
             )
+            stdout = process.stdout
+            assert stdout is not None  # stdout=PIPEなので常にある
+            if cancel_event is not None:
+                cancel_event.attach(process)
             
-            # 結果を1行ずつ処理
-            for line in process.stdout:
-                try:
-                    data = json.loads(line.strip())
-                    if data.get('type') == 'match':
-                        match_data = data['data']
-                        for submatch in match_data.get('submatches', []):
-                            yield SearchResult(
-                                file_path=match_data['path']['text'],
-                                line_number=match_data['line_number'],
-                                line_content=match_data['lines']['text'].rstrip('\n'),
-                                match_start=submatch['start'],
-                                match_end=submatch['end']
-                            )
-                except json.JSONDecodeError:
-                    logger.warning(f"JSONパースエラー: {line}")
+            try:
+                # 結果を1行ずつ処理（orjsonはバイト列を直接パースできる）
+                for line in iter(stdout.readline, b''):
+                    # begin/end/context/summaryの行はパースせずに読み飛ばす
+                    if not line.startswith(_RG_MATCH_PREFIX):
+                        continue
+                    try:
+                        match_data = orjson.loads(line)['data']
+                    except orjson.JSONDecodeError:
+                        logger.warning(f"JSONパースエラー: {line!r}")
+                        continue
+                        
+                    file_path = _rg_text(match_data['path'])
+                    line_number = match_data['line_number']
+                    line_content = _rg_text(match_data['lines']).rstrip('\n')
+                    # ripgrepの一致位置はバイト単位なので、ASCII以外を含む行は文字位置に直す
+                    line_bytes = None if line_content.isascii() else line_content.encode('utf-8')
+                    for submatch in match_data.get('submatches', []):
+                        match_start, match_end = submatch['start'], submatch['end']
+                        if line_bytes is not None:
+                            match_start = _char_offset(line_bytes, match_start)
+                            match_end = _char_offset(line_bytes, match_end)
+                        yield SearchResult(
+                            file_path=file_path,
+                            line_number=line_number,
+                            line_content=line_content,
+                            match_start=match_start,
+                            match_end=match_end
+                        )
                     
-            process.wait()
+                process.wait()
+            finally:
+                if cancel_event is not None:
+                    cancel_event.detach()
+                # 検索が途中で打ち切られた場合はripgrepを終了させる
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                stdout.close()
             
         except subprocess.SubprocessError as e:
             logger.error(f"ripgrep実行エラー: {e}")
             if self.fallback_to_python:
-                yield from self._search_with_python(query, path, options)
+                yield from self._search_with_python(query, path, options, cancel_event)
             else:
                 raise
                 
@@ -148,65 +309,151 @@ class RipgrepWrapper:
         self, 
         query: str, 
         path: Path, 
-        options: SearchOptions
+        options: SearchOptions,
+        cancel_event: Optional[SearchCancelEvent] = None
     ) -> Iterator[SearchResult]:
-        """Pythonのみを使用したフォールバック検索"""
-        # 正規表現パターンの準備
-        if options.use_regex:
-            flags = 0 if options.case_sensitive else re.IGNORECASE
-            regex_pattern = re.compile(query, flags)
+        """Pythonのみを使用したフォールバック検索（cancel_eventはファイルごとに確認）"""
+        # 通常はファイルのバイト列をASCIIの大文字小文字判定で直接走査し、
+        # unicode指定時だけデコードした文字列をUnicodeの大文字小文字判定で走査する
+        flags = re.MULTILINE
+        if not options.case_sensitive:
+            flags |= re.IGNORECASE if options.unicode else re.IGNORECASE | re.ASCII
+        
+        # 検索パターンの準備（リテラル検索の場合はエスケープ）
+        pattern: Pattern
+        if options.unicode:
+            pattern = _compile(query if options.use_regex else re.escape(query), flags)
         else:
-            # リテラル検索の場合
-            query_lower = query if options.case_sensitive else query.lower()
+            query_bytes = query.encode('utf-8')
+            pattern = _compile(query_bytes if options.use_regex else re.escape(query_bytes), flags)
+        if options.use_regex and isinstance(pattern, re.Pattern) and isinstance(pattern.pattern, bytes):
+            # 標準のreでバイト列を照合すると . や文字クラスが1バイト単位になり、
+            # マルチバイト文字の途中から一致してしまうのでデコードした文字列で照合する
+            # （RE2はバイト列でもUTF-8の文字単位で照合する）
+            pattern = _compile(query, flags)
         
-        # ファイルパターンの準備
-        file_patterns = ['*.md', '*.py', '*.txt'] if not options.file_types else [
-            f'*.{ft}' for ft in options.file_types
-        ]
+        # 対象拡張子の準備
+        extensions = extensions_for(options.file_types)
         
         result_count = 0
         
         # ファイルを再帰的に検索
-        for file_pattern in file_patterns:
-            for file_path in path.rglob(file_pattern):
-                if result_count >= (options.max_results or float('inf')):
-                    return
-                    
-                try:
-                    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                        for line_num, line in enumerate(f, 1):
-                            if options.use_regex:
-                                matches = list(regex_pattern.finditer(line))
-                                for match in matches:
-                                    yield SearchResult(
-                                        file_path=str(file_path),
-                                        line_number=line_num,
-                                        line_content=line.rstrip('\n'),
-                                        match_start=match.start(),
-                                        match_end=match.end()
-                                    )
-                                    result_count += 1
-                            else:
-                                # リテラル検索
-                                search_line = line if options.case_sensitive else line.lower()
-                                start = 0
-                                while True:
-                                    pos = search_line.find(query_lower, start)
-                                    if pos == -1:
-                                        break
-                                    yield SearchResult(
-                                        file_path=str(file_path),
-                                        line_number=line_num,
-                                        line_content=line.rstrip('\n'),
-                                        match_start=pos,
-                                        match_end=pos + len(query)
-                                    )
-                                    result_count += 1
-                                    start = pos + 1
-                                    
-                except (IOError, OSError) as e:
-                    logger.warning(f"ファイル読み込みエラー: {file_path} - {e}")
+        for file_path in self._list_files(path, extensions):
+            if result_count >= (options.max_results or float('inf')):
+                return
+            if cancel_event is not None and cancel_event.is_set():
+                return
+                
+            try:
+                for result in self._scan_file(file_path, pattern, options.mmap):
+                    yield result
+                    result_count += 1
+            except FileNotFoundError:
+                # 一覧の取得後に削除・リネームされたファイル（次の検索では一覧を取り直す）
+                self.clear_file_cache()
+            except (IOError, OSError) as e:
+                logger.warning(f"ファイル読み込みエラー: {file_path} - {e}")
+                
+    def _scan_file(
+        self,
+        file_path: Path,
+        pattern: Pattern,
+        use_mmap: bool = False
+    ) -> Iterator[SearchResult]:
+        """
+        ファイルを読み込んでパターンに一致する行を列挙
+        
+        ripgrepと同じく既定ではメモリマップを使わない
+        （編集中のファイルが切り詰められるとSIGBUSで落ちるため）。
+        """
+        if isinstance(pattern.pattern, str):
+            text = file_path.read_text(encoding='utf-8', errors='ignore')
+            yield from self._scan_buffer(file_path, text, '\n', pattern)
+            return
+            
+        with open(file_path, 'rb') as f:
+            # 空ファイルはメモリマップできない
+            if not use_mmap or os.fstat(f.fileno()).st_size == 0:
+                yield from self._scan_buffer(file_path, f.read(), b'\n', pattern)
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                # mmapはbytesと同じくfind/rfind/スライスで扱える
+                yield from self._scan_buffer(file_path, cast(bytes, mm), b'\n', pattern)
+                
+    def _scan_buffer(
+        self,
+        file_path: Path,
+        buffer: AnyStr,
+        newline: AnyStr,
+        pattern: Pattern[AnyStr]
+    ) -> Iterator[SearchResult]:
+        """
+        ファイル全体のバッファからパターンに一致する行を列挙
+        
+        行ごとに分割せずバッファ全体を検索して一致する行を見つけ、
+        その行の範囲だけで改めて照合する（ripgrepと同じく一致は行をまたがない）。
+        行番号は直前に見つけた行からの改行数を数えて求める。
+        一致位置はバイト列を走査した場合も行頭からの文字位置に直して返す。
+        """
+        line_number = 1
+        counted_until = 0
+        pos = 0
+        while True:
+            match = pattern.search(buffer, pos)
+            if match is None:
+                return
+                
+            line_start = buffer.rfind(newline, 0, match.start()) + 1
+            line_end = buffer.find(newline, match.start())
+            if line_end == -1:
+                line_end = len(buffer)
+            line_number += buffer[counted_until:line_start].count(newline)
+            counted_until = line_start
+            
+            line_matches = list(pattern.finditer(buffer, line_start, line_end))
+            if line_matches:
+                line = buffer[line_start:line_end]
+                if isinstance(line, bytes):
+                    line_content = line.decode('utf-8', errors='ignore').rstrip('\r')
+                else:
+                    line_content = line.rstrip('\r')
+                for line_match in line_matches:
+                    match_start = line_match.start() - line_start
+                    match_end = line_match.end() - line_start
+                    if isinstance(line, bytes) and not line.isascii():
+                        match_start = _char_offset(line, match_start)
+                        match_end = _char_offset(line, match_end)
+                    yield SearchResult(
+                        file_path=str(file_path),
+                        line_number=line_number,
+                        line_content=line_content,
+                        match_start=match_start,
+                        match_end=match_end
+                    )
                     
+            # 改行をまたいだ一致しかなかった行も含めて次の行から探す
+            pos = line_end + 1
+            if pos > len(buffer):
+                return
+            
+    def _list_files(self, path: Path, extensions: Tuple[str, ...]) -> List[Path]:
+        """検索対象ファイルの一覧を取得（パスと拡張子ごとにFILE_LIST_TTL秒キャッシュ）"""
+        cache_key = (path, extensions)
+        now = time.monotonic()
+        cached = self._file_list_cache.get(cache_key)
+        if cached is not None and now - cached[0] < self.FILE_LIST_TTL:
+            return cached[1]
+            
+        # ripgrepと同じく大きいファイル（ログなど）も検索する
+        # （サイズ制限はセマンティック検索のインデックス用）
+        files = list(iter_files(path, extensions, max_file_size=None))
+        self._file_list_cache[cache_key] = (now, files)
+        return files
+        
+    def clear_file_cache(self) -> None:
+        """ファイル一覧キャッシュをクリア"""
+        self._file_list_cache.clear()
+        
     def is_available(self) -> bool:
         """ripgrepが利用可能かどうか"""
         return self._ripgrep_available
\ No newline at end of file
@@ -3,11 +3,17 @@
 """
 import numpy as np
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
-import pickle
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Tuple, cast
+import os
 import hashlib
+import json
+import threading
 from dataclasses import dataclass
 import logging
+from collections import OrderedDict
+
+if TYPE_CHECKING:
+    import hnswlib
 
 logger = logging.getLogger(__name__)
 
@@ -24,6 +30,27 @@ class SemanticSearchResult:
 class SemanticSearchEngine:
     """セマンティック検索を実行するエンジン"""
     
+    # ローカルモデルの1バッチあたりのチャンク数
+    LOCAL_BATCH_SIZE = 64
+    # インデックス構築時に溜めてから埋め込むチャンク数
+    INDEX_BATCH_SIZE = 64
+    # OpenAI Embeddings APIの1リクエストあたりの入力数
+    OPENAI_BATCH_SIZE = 100
+    
+    # ローカルの埋め込みモデル（日本語対応の軽量モデル）
+    LOCAL_MODEL_NAME = 'all-MiniLM-L6-v2'
+    
+    # この件数未満のチャンクは総当たりの方が速いのでHNSWを使わない
+    HNSW_MIN_ELEMENTS = 1000
+    
+    # クエリ埋め込みのLRUキャッシュの最大件数
+    QUERY_CACHE_SIZE = 1024
+    
+    # 埋め込み行列の保存形式（正規化済みベクトルなのでfloat16で精度は十分）
+    EMBEDDING_DTYPE = np.float16
+    # 類似度計算時にfloat32へ戻して処理する行数
+    SIMILARITY_BLOCK_ROWS = 4096
+    
     def __init__(self, cache_dir: Optional[Path] = None, use_openai: bool = False):
         """
         Args:
@@ -37,13 +64,34 @@ class SemanticSearchEngine:
         # 埋め込みモデル（遅延初期化）
         self._model = None
         self._openai_client = None
-        self._embeddings_cache: Dict[str, np.ndarray] = {}
         
-        # 環境変数から設定読み込み
-        import os
+        # 環境変数から設定読み込み（保存済みインデックスのモデル判定に使うので先に読む）
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
         
+        # クエリ -> 正規化済み埋め込み（同じクエリの再検索で埋め込み生成を省く）
+        # 検索は複数のスレッドから呼ばれるので、キャッシュの操作はロックで守る
+        self._query_embed_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._query_cache_lock = threading.Lock()
+        
+        # 検索用の埋め込み行列（正規化済みの行ベクトル）と行に対応するキー、
+        # 行列を埋め込んだモデル
+        self._matrix: Optional[np.ndarray] = None
+        self._keys: List[str] = []
+        self._index_model: Optional[str] = None
+        self._load_index()
+        
+        # HNSW近似最近傍インデックス（hnswlibがある場合のみ）
+        self._hnsw_index: Optional["hnswlib.Index"] = None
+        self._load_hnsw_index()
+        
+    @property
+    def model_id(self) -> str:
+        """埋め込みに使うモデルの識別子（インデックスと一緒に保存する）"""
+        if self.use_openai and self.openai_api_key:
+            return f"openai:{self.embedding_model}"
+        return f"local:{self.LOCAL_MODEL_NAME}"
+        
     @property
     def model(self):
         """埋め込みモデルの遅延初期化"""
@@ -64,8 +112,7 @@ class SemanticSearchEngine:
             if self._model is None:
                 try:
                     from sentence_transformers import SentenceTransformer
-                    # 日本語対応の軽量モデル
-                    self._model = SentenceTransformer('all-MiniLM-L6-v2')
+                    self._model = SentenceTransformer(self.LOCAL_MODEL_NAME)
                     logger.info("ローカルセマンティック検索モデルを読み込みました")
                 except ImportError:
                     logger.error("sentence-transformersがインストールされていません")
@@ -75,32 +122,102 @@ class SemanticSearchEngine:
                     )
             return self._model
         
-    def build_index(self, documents: List[Tuple[str, str]]) -> None:
+    def build_index(self, documents: Iterable[Tuple[str, str]]) -> None:
         """
         ドキュメントのインデックスを構築
         
+        前回のインデックスに同じチャンクがあれば埋め込みを再利用し、
+        変更されたチャンクだけを新たに埋め込む。ドキュメントは1つずつ
+        処理して破棄するので、ジェネレータを渡せば全ファイルの内容を
+        同時にメモリへ載せずに済む。
+        
         Args:
-            documents: (file_path, content) のタプルのリスト
+            documents: (file_path, content) のタプルのイテラブル
         """
-        logger.info(f"{len(documents)}個のドキュメントをインデックス化します")
+        if self._index_model != self.model_id:
+            # 別のモデルで埋め込んだ行列は次元も意味も異なるので再利用しない
+            self._matrix = None
+            self._keys = []
+            self._hnsw_index = None
+            
+        # 前回のインデックスに同じ内容のチャンクがあれば埋め込みを再利用する
+        # （キーの末尾は内容のハッシュなので、ファイル名の変更や移動にも追従できる）
+        previous_matrix = self._matrix
+        known_rows = (
+            {key.rsplit(':', 1)[-1]: row for row, key in enumerate(self._keys)}
+            if previous_matrix is not None else {}
+        )
+        keys: List[str] = []
+        vectors: List[Optional[np.ndarray]] = []
+        # キャッシュにないチャンクを内容ごとに1つだけ集めて、まとめて埋め込みを生成する
+        to_embed: List[Tuple[str, str]] = []
+        pending: Dict[str, List[int]] = {}
+        # 今回の構築で埋め込んだチャンク（同じ内容を二度埋め込まないため。
+        # 構築後は埋め込み行列の行として再利用するので、構築中だけ保持する）
+        embedded: Dict[str, np.ndarray] = {}
+        
+        def flush() -> None:
+            """溜まったチャンクをバッチで埋め込む"""
+            embeddings = self._generate_embeddings([chunk for _, chunk in to_embed])
+            for (content_hash, _), embedding in zip(to_embed, embeddings):
+                vector = self._normalize(embedding)
+                embedded[content_hash] = vector
+                for position in pending[content_hash]:
+                    vectors[position] = vector
+            to_embed.clear()
+            pending.clear()
         
+        num_documents = 0
         for file_path, content in documents:
+            num_documents += 1
             # ドキュメントをチャンクに分割
             chunks = self._split_into_chunks(content)
             
-            # 各チャンクの埋め込みを生成
             for i, chunk in enumerate(chunks):
-                cache_key = self._get_cache_key(file_path, i, chunk)
+                # エンコードはチャンクごとに1回だけ（モデルには文字列のまま渡す）
+                content_hash = self._content_hash(chunk.encode('utf-8'))
+                cache_key = self._get_cache_key(file_path, i, content_hash)
+                keys.append(cache_key)
                 
-                # キャッシュチェック
-                cached_embedding = self._load_cached_embedding(cache_key)
-                if cached_embedding is not None:
-                    self._embeddings_cache[cache_key] = cached_embedding
+                # キャッシュチェック（前回のインデックス、次に今回埋め込んだチャンク）
+                row = known_rows.get(content_hash)
+                if row is not None and previous_matrix is not None:
+                    vectors.append(previous_matrix[row])
+                elif content_hash in embedded:
+                    vectors.append(embedded[content_hash])
                 else:
-                    # 新規生成
-                    embedding = self._generate_embedding(chunk)
-                    self._embeddings_cache[cache_key] = embedding
-                    self._save_cached_embedding(cache_key, embedding)
+                    if content_hash not in pending:
+                        pending[content_hash] = []
+                        to_embed.append((content_hash, chunk))
+                    pending[content_hash].append(len(vectors))
+                    vectors.append(None)
+                    
+            if len(to_embed) >= self.INDEX_BATCH_SIZE:
+                flush()
+                
+        if to_embed:
+            flush()
+            
+        logger.info(f"{num_documents}個のドキュメント（{len(keys)}チャンク）をインデックス化しました")
+                    
+        if keys == self._keys and self._matrix is not None:
+            logger.info("インデックスは最新です")
+            if self._hnsw_index is None:
+                self._build_hnsw_index()
+            return
+                    
+        # 類似度計算を1回の行列ベクトル積で行うため、連続した行列にまとめる
+        self._keys = keys
+        self._index_model = self.model_id
+        if vectors:
+            # この時点ですべてのチャンクの埋め込みが揃っている
+            matrix = np.stack(cast(List[np.ndarray], vectors), axis=0)
+            self._matrix = matrix.astype(self.EMBEDDING_DTYPE)
+        else:
+            self._matrix = None
+            
+        self._save_index()
+        self._build_hnsw_index()
                     
     def search(
         self, 
@@ -119,28 +236,28 @@ class SemanticSearchEngine:
         Returns:
             検索結果のリスト
         """
-        if not self._embeddings_cache:
+        if not self._keys:
             logger.warning("インデックスが構築されていません")
             return []
+        if self._index_model != self.model_id:
+            logger.warning("インデックスが現在のモデルで構築されていません")
+            return []
+        if top_k <= 0:
+            return []
             
-        # クエリの埋め込みを生成
-        query_embedding = self._generate_embedding(query)
+        # クエリの埋め込みを取得（正規化済みなので内積がコサイン類似度になる）
+        query_embedding = self._embed_query(query)
         
-        # 全ての埋め込みとの類似度を計算
-        similarities = []
-        for cache_key, doc_embedding in self._embeddings_cache.items():
-            similarity = self._cosine_similarity(query_embedding, doc_embedding)
-            if similarity >= similarity_threshold:
-                similarities.append((cache_key, similarity))
-                
-        # スコアでソート
-        similarities.sort(key=lambda x: x[1], reverse=True)
+        if self._hnsw_index is not None:
+            hits = self._search_hnsw(query_embedding, top_k, similarity_threshold)
+        else:
+            hits = self._search_brute_force(query_embedding, top_k, similarity_threshold)
         
         # 結果を構築
         results = []
-        for cache_key, similarity in similarities[:top_k]:
+        for index, similarity in hits:
             # cache_keyから情報を復元
-            file_path, chunk_index, content = self._parse_cache_key(cache_key)
+            file_path, chunk_index, content = self._parse_cache_key(self._keys[index])
             results.append(SemanticSearchResult(
                 file_path=file_path,
                 content=content,
@@ -150,73 +267,266 @@ class SemanticSearchEngine:
             
         return results
         
+    def clear_query_cache(self) -> None:
+        """クエリ埋め込みのキャッシュをクリア"""
+        with self._query_cache_lock:
+            self._query_embed_cache.clear()
+        
+    def _embed_query(self, query: str) -> np.ndarray:
+        """
+        クエリの正規化済み埋め込みを取得（LRUキャッシュ付き）
+        
+        埋め込みの生成はロックの外で行う（同じクエリが同時に来た場合は
+        それぞれ生成して、後から終わった方でキャッシュを上書きする）。
+        """
+        with self._query_cache_lock:
+            cached = self._query_embed_cache.get(query)
+            if cached is not None:
+                self._query_embed_cache.move_to_end(query)
+                return cached
+            
+        embedding = self._normalize(self._generate_embedding(query))
+        with self._query_cache_lock:
+            self._query_embed_cache[query] = embedding
+            if len(self._query_embed_cache) > self.QUERY_CACHE_SIZE:
+                self._query_embed_cache.popitem(last=False)
+        return embedding
+        
+    def _search_brute_force(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        similarity_threshold: float
+    ) -> List[Tuple[int, float]]:
+        """埋め込み行列との行列ベクトル積で全件の類似度を計算"""
+        similarities = self._matrix_similarities(query_embedding)
+        candidates = np.flatnonzero(similarities >= similarity_threshold)
+        
+        # 上位top_k件だけを部分ソートで取り出してからスコア順に並べる
+        if candidates.size > top_k:
+            top = np.argpartition(-similarities[candidates], top_k - 1)[:top_k]
+            candidates = candidates[top]
+        candidates = candidates[np.argsort(-similarities[candidates], kind="stable")]
+        
+        return [(int(index), float(similarities[index])) for index in candidates]
+        
+    def _matrix_similarities(self, query_embedding: np.ndarray) -> np.ndarray:
+        """
+        埋め込み行列の全行とクエリの内積を計算
+        
+        NumPyのfloat16演算はBLASを使えないため、行列はfloat16のまま保持し、
+        ブロックごとにfloat32へ変換してから行列ベクトル積を計算する。
+        """
+        matrix = self._matrix
+        if matrix is None:
+            return np.empty(0, dtype=np.float32)
+            
+        num_rows = matrix.shape[0]
+        similarities = np.empty(num_rows, dtype=np.float32)
+        for start in range(0, num_rows, self.SIMILARITY_BLOCK_ROWS):
+            end = start + self.SIMILARITY_BLOCK_ROWS
+            # astypeは常に新しいC連続配列を返すので、BLASのSGEMVがそのまま使える
+            block = matrix[start:end].astype(np.float32)
+            similarities[start:end] = block @ query_embedding
+        return similarities
+        
+    def _search_hnsw(
+        self,
+        query_embedding: np.ndarray,
+        top_k: int,
+        similarity_threshold: float
+    ) -> List[Tuple[int, float]]:
+        """HNSWインデックスで近似最近傍検索"""
+        index = self._hnsw_index
+        if index is None:
+            return []
+            
+        k = min(top_k, len(self._keys))
+        # efはk以上である必要がある（大きいほど再現率が上がる）
+        index.set_ef(max(50, k))
+        labels, distances = index.knn_query(query_embedding, k=k)
+        
+        hits = []
+        for label, distance in zip(labels[0], distances[0]):
+            # cosine空間の距離は 1 - 類似度
+            similarity = 1.0 - float(distance)
+            if similarity >= similarity_threshold:
+                hits.append((int(label), similarity))
+        return hits
+        
+    def _build_hnsw_index(self) -> None:
+        """埋め込み行列からHNSWインデックスを構築して保存"""
+        index_file = self.cache_dir / "hnsw.bin"
+        self._hnsw_index = None
+        if self._matrix is None or len(self._keys) < self.HNSW_MIN_ELEMENTS:
+            # 古いインデックスが次回起動時に読み込まれないよう削除
+            index_file.unlink(missing_ok=True)
+            return
+            
+        try:
+            import hnswlib
+        except ImportError:
+            logger.info("hnswlibがインストールされていないため総当たり検索を使用します")
+            index_file.unlink(missing_ok=True)
+            return
+            
+        num_elements, dim = self._matrix.shape
+        index = hnswlib.Index(space='cosine', dim=dim)
+        index.init_index(max_elements=num_elements, ef_construction=200, M=16)
+        # ラベルは埋め込み行列（keys.json）の行番号
+        index.add_items(
+            np.ascontiguousarray(self._matrix, dtype=np.float32), np.arange(num_elements)
+        )
+        self._hnsw_index = index
+        
+        try:
+            index.save_index(str(index_file))
+        except Exception as e:
+            logger.warning(f"HNSWインデックス保存エラー: {e}")
+            
+    def _load_hnsw_index(self) -> None:
+        """保存済みのHNSWインデックスを読み込み"""
+        index_file = self.cache_dir / "hnsw.bin"
+        if self._matrix is None or not index_file.exists():
+            return
+            
+        try:
+            import hnswlib
+        except ImportError:
+            return
+            
+        try:
+            index = hnswlib.Index(space='cosine', dim=self._matrix.shape[1])
+            index.load_index(str(index_file), max_elements=len(self._keys))
+            if index.get_current_count() != len(self._keys):
+                logger.warning("HNSWインデックスがキー一覧と一致しないため使用しません")
+                return
+            self._hnsw_index = index
+        except Exception as e:
+            logger.warning(f"HNSWインデックス読み込みエラー: {e}")
+            
     def _split_into_chunks(self, content: str, chunk_size: int = 500) -> List[str]:
         """テキストをチャンクに分割"""
-        # 簡易的な実装：改行で分割してから結合
-        lines = content.split('\n')
+        # 簡易的な実装：行単位でchunk_sizeを超えない範囲にまとめる
+        # （行のリストを作って結合し直さず、改行位置から元の文字列を切り出す）
         chunks = []
-        current_chunk = []
+        content_length = len(content)
+        chunk_start = 0
         current_size = 0
+        line_start = 0
         
-        for line in lines:
-            line_size = len(line)
-            if current_size + line_size > chunk_size and current_chunk:
-                chunks.append('\n'.join(current_chunk))
-                current_chunk = [line]
+        while True:
+            line_end = content.find('\n', line_start)
+            if line_end == -1:
+                line_end = content_length
+            line_size = line_end - line_start
+            
+            if current_size + line_size > chunk_size and line_start > chunk_start:
+                # 直前の改行は含めずに切り出す
+                chunks.append(content[chunk_start:line_start - 1])
+                chunk_start = line_start
                 current_size = line_size
             else:
-                current_chunk.append(line)
                 current_size += line_size
                 
-        if current_chunk:
-            chunks.append('\n'.join(current_chunk))
+            if line_end == content_length:
+                break
+            line_start = line_end + 1
             
+        chunks.append(content[chunk_start:])
         return chunks
         
-    def _cosine_similarity(self, vec1: np.ndarray, vec2: np.ndarray) -> float:
-        """コサイン類似度を計算"""
-        dot_product = np.dot(vec1, vec2)
-        norm1 = np.linalg.norm(vec1)
-        norm2 = np.linalg.norm(vec2)
+    @staticmethod
+    def _normalize(vec: np.ndarray) -> np.ndarray:
+        """ベクトルをL2正規化（float32の連続配列で返す。ゼロベクトルはそのまま返す）"""
+        vec = np.ascontiguousarray(vec, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        if norm == 0:
+            return vec
+        return vec / norm
         
-        if norm1 == 0 or norm2 == 0:
-            return 0.0
-            
-        return dot_product / (norm1 * norm2)
+    @staticmethod
+    def _content_hash(content: bytes) -> str:
+        """チャンク内容（UTF-8バイト列）のハッシュ（ファイルの場所に依存しない）"""
+        return hashlib.blake2b(content, digest_size=16).hexdigest()
         
-    def _get_cache_key(self, file_path: str, chunk_index: int, content: str) -> str:
+    def _get_cache_key(self, file_path: str, chunk_index: int, content_hash: str) -> str:
         """キャッシュキーを生成"""
-        content_hash = hashlib.md5(content.encode()).hexdigest()[:8]
         return f"{file_path}:{chunk_index}:{content_hash}"
         
     def _parse_cache_key(self, cache_key: str) -> Tuple[str, int, str]:
         """キャッシュキーから情報を復元（簡易実装）"""
-        parts = cache_key.split(':')
-        file_path = parts[0]
-        chunk_index = int(parts[1])
+        # ファイルパス自体に':'が含まれることがあるので右から分割
+        file_path, chunk_index_str, _ = cache_key.rsplit(':', 2)
+        chunk_index = int(chunk_index_str)
         # contentは実際のファイルから取得する必要がある
         content = f"[Chunk {chunk_index} from {file_path}]"
         return file_path, chunk_index, content
         
-    def _load_cached_embedding(self, cache_key: str) -> Optional[np.ndarray]:
-        """キャッシュから埋め込みを読み込み"""
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
-        if cache_file.exists():
-            try:
-                with open(cache_file, 'rb') as f:
-                    return pickle.load(f)
-            except Exception as e:
-                logger.warning(f"キャッシュ読み込みエラー: {e}")
-        return None
+    def _load_index(self) -> None:
+        """
+        保存済みの埋め込み行列とキー一覧を読み込み
         
-    def _save_cached_embedding(self, cache_key: str, embedding: np.ndarray) -> None:
-        """埋め込みをキャッシュに保存"""
-        cache_file = self.cache_dir / f"{cache_key}.pkl"
+        現在のモデルと異なるモデル（またはモデルの記録がない古い形式）で
+        作られたインデックスは読み込まず、次の構築ですべて埋め込み直す。
+        """
+        matrix_file = self.cache_dir / "embeddings.npy"
+        keys_file = self.cache_dir / "keys.json"
+        meta_file = self.cache_dir / "index_meta.json"
+        if not (matrix_file.exists() and keys_file.exists()):
+            return
+            
         try:
-            # キャッシュディレクトリが存在しない場合は作成
-            cache_file.parent.mkdir(parents=True, exist_ok=True)
-            with open(cache_file, 'wb') as f:
-                pickle.dump(embedding, f)
+            meta = {}
+            if meta_file.exists():
+                with open(meta_file, 'r', encoding='utf-8') as f:
+                    meta = json.load(f)
+            if meta.get('model') != self.model_id:
+                logger.info(
+                    f"キャッシュのインデックスは別のモデル（{meta.get('model')}）で作られたため使用しません"
+                )
+                return
+            with open(keys_file, 'r', encoding='utf-8') as f:
+                keys = json.load(f)
+            # メモリマップで開き、実際に参照したページだけを読み込む
+            matrix = np.load(matrix_file, mmap_mode='r')
+            if matrix.ndim != 2 or matrix.shape[0] != len(keys):
+                logger.warning("キャッシュの埋め込み行列とキー一覧が一致しません")
+                return
+            if matrix.shape[1] != meta.get('dim'):
+                logger.warning("キャッシュの埋め込み行列の次元がモデルの記録と一致しません")
+                return
+            self._matrix = matrix
+            self._keys = keys
+            self._index_model = self.model_id
+        except Exception as e:
+            logger.warning(f"キャッシュ読み込みエラー: {e}")
+            
+    def _save_index(self) -> None:
+        """埋め込み行列とキー一覧、埋め込んだモデルをキャッシュに保存"""
+        matrix_file = self.cache_dir / "embeddings.npy"
+        keys_file = self.cache_dir / "keys.json"
+        meta_file = self.cache_dir / "index_meta.json"
+        try:
+            if self._matrix is None:
+                matrix_file.unlink(missing_ok=True)
+                keys_file.unlink(missing_ok=True)
+                meta_file.unlink(missing_ok=True)
+                return
+                
+            # 読み込み中のメモリマップを壊さないよう、一時ファイルに書いてから置き換える
+            tmp_matrix_file = self.cache_dir / "embeddings.npy.tmp"
+            with open(tmp_matrix_file, 'wb') as f:
+                np.save(f, self._matrix)
+            tmp_keys_file = self.cache_dir / "keys.json.tmp"
+            with open(tmp_keys_file, 'w', encoding='utf-8') as f:
+                json.dump(self._keys, f, ensure_ascii=False)
+            tmp_meta_file = self.cache_dir / "index_meta.json.tmp"
+            with open(tmp_meta_file, 'w', encoding='utf-8') as f:
+                json.dump({'model': self._index_model, 'dim': int(self._matrix.shape[1])}, f)
+            os.replace(tmp_matrix_file, matrix_file)
+            os.replace(tmp_keys_file, keys_file)
+            os.replace(tmp_meta_file, meta_file)
         except Exception as e:
             logger.warning(f"キャッシュ保存エラー: {e}")
             
@@ -229,15 +539,43 @@ class SemanticSearchEngine:
                     model=self.embedding_model,
                     input=text
                 )
-                embedding = np.array(response.data[0].embedding)
-                return embedding
+                # APIはfloatのリストを返すので、float64にならないようfloat32で受け取る
+                return np.asarray(response.data[0].embedding, dtype=np.float32)
             except Exception as e:
+                # ローカルモデルは次元が異なり、インデックスと比較できないので代わりに使わない
                 logger.error(f"OpenAI Embeddings エラー: {e}")
-                # フォールバックとしてローカルモデルを使用
-                if not hasattr(self, '_fallback_model'):
-                    from sentence_transformers import SentenceTransformer
-                    self._fallback_model = SentenceTransformer('all-MiniLM-L6-v2')
-                return self._fallback_model.encode(text)
+                raise
         else:
             # ローカルモデル
-            return self.model.encode(text)
\ No newline at end of file
+            return self.model.encode(text)
+            
+    def _generate_embeddings(self, texts: List[str]) -> np.ndarray:
+        """複数テキストの埋め込みベクトルをバッチで生成"""
+        if self.use_openai and self.openai_api_key:
+            # OpenAI Embeddings（1リクエストで複数入力を送る）
+            embeddings: List[np.ndarray] = []
+            for start in range(0, len(texts), self.OPENAI_BATCH_SIZE):
+                batch = texts[start:start + self.OPENAI_BATCH_SIZE]
+                try:
+                    response = self.model.embeddings.create(
+                        model=self.embedding_model,
+                        input=batch
+                    )
+                    embeddings.extend(
+                        np.asarray(d.embedding, dtype=np.float32) for d in response.data
+                    )
+                except Exception as e:
+                    # 一部のバッチだけローカルモデルで埋め込むと次元の異なるベクトルが
+                    # 同じ行列に混ざるので、フォールバックせずにインデックス構築を失敗させる
+                    logger.error(f"OpenAI Embeddings エラー: {e}")
+                    raise
+            return np.stack(embeddings, axis=0)
+        else:
+            # ローカルモデル（モデル内部のバッチ処理を利用）
+            return np.asarray(self.model.encode(
+                texts,
+                batch_size=self.LOCAL_BATCH_SIZE,
+                show_progress_bar=False,
+                convert_to_numpy=True,
+                normalize_embeddings=True
+            ))
@@ -2,12 +2,32 @@
 TUIとripgrep統合モジュール
 """
 from pathlib import Path
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, AsyncIterator, Dict, Iterator, List, Optional, Tuple
 import asyncio
+import re
 
-from ..core.ripgrep_wrapper import RipgrepWrapper, SearchOptions, SearchResult
+from ..core.ripgrep_wrapper import RipgrepWrapper, SearchCancelEvent, SearchOptions, SearchResult
 from ..core.semantic_search import SemanticSearchEngine, SemanticSearchResult
-from .tui_main import SearchResult as UISearchResult, SearchResultsContainer
+from ..core.file_collector import iter_documents, iter_files
+
+if TYPE_CHECKING:
+    # UIのウィジェット（textual）は実際に検索するときまで読み込まない
+    from .tui_main import SearchResult as UISearchResult
+
+# スコアを上げるファイルの判定（パスを小文字化せずに大文字小文字を無視して照合）
+_README_RE = re.compile(r'readme', re.IGNORECASE)
+_EXT_RE = re.compile(r'\.(md|rst|txt)$', re.IGNORECASE)
+
+# 正規表現のメタ文字（含まないクエリはリテラル検索で十分）
+_REGEX_META_RE = re.compile(r'[.^$*+?()\[\]{}|\\]')
+
+# ファイルタイプ未指定時に検索する種類（ripgrepのタイプ名）
+DEFAULT_FILE_TYPES = ['md', 'rst', 'txt', 'py']
+
+# 検索スレッドから結果の終わりを知らせる番兵
+_SEARCH_DONE = object()
 
 
 class SearchIntegration:
@@ -22,96 +42,185 @@ class SearchIntegration:
         self._semantic_engine: Optional[SemanticSearchEngine] = None
         self._semantic_available = self._check_semantic_available()
         
+        # 実行中の検索の中断フラグ（同時に実行する検索は1つだけ）
+        self._cancel_event: Optional[SearchCancelEvent] = None
+        
+        # ファイルパスごとのスコア（検索をまたいで使い回す）
+        self._path_bonus: Dict[str, int] = {}
+        
+        # 検索・インデックス構築専用のスレッドプール
+        # （asyncioのデフォルトexecutorを他の処理と取り合わないように分ける）
+        self._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='search')
+        
     async def perform_search(
         self, 
         query: str, 
         use_regex: bool = True,
         file_types: Optional[List[str]] = None,
         max_results: int = 100
-    ) -> List[UISearchResult]:
-        """非同期で検索を実行してUI用の結果を返す"""
+    ) -> List["UISearchResult"]:
+        """非同期で検索を実行してUI用の結果をスコア順で返す"""
+        ui_results = [
+            result
+            async for result in self.stream_search(query, use_regex, file_types, max_results)
+        ]
+            
+        # スコアでソート
+        ui_results.sort(key=lambda x: x.score, reverse=True)
+            
+        return ui_results
+        
+    async def stream_search(
+        self, 
+        query: str, 
+        use_regex: bool = True,
+        file_types: Optional[List[str]] = None,
+        max_results: int = 100
+    ) -> AsyncIterator["UISearchResult"]:
+        """
+        非同期で検索を実行し、見つかった順にUI用の結果を返す
+        
+        ripgrepの結果は別スレッドで読み取りながら1件ずつ返すので、
+        検索全体の完了を待たずに最初の結果を表示できる。
+        セマンティック検索の結果は最後にまとめて返す。
+        """
         if not query:
-            return []
+            return
             
-        # 検索オプションの設定
+        # メタ文字を含まないクエリはripgrepの高速なリテラル検索（-F）に回す
+        use_regex = use_regex and _REGEX_META_RE.search(query) is not None
+        
+        # 検索オプションの設定（ファイルタイプの絞り込みはripgrep側で行う）
         options = SearchOptions(
             use_regex=use_regex,
-            file_types=file_types,
+            file_types=file_types or DEFAULT_FILE_TYPES,
             max_results=max_results,
             case_sensitive=False,  # デフォルトは大文字小文字無視
             context_lines=2  # 前後2行のコンテキスト
         )
         
-        # 検索実行（別スレッドで）
-        loop = asyncio.get_event_loop()
-        results = await loop.run_in_executor(
-            None,
-            self._search_sync,
-            query,
-            self.search_path,
-            options
-        )
+        # 前の検索が実行中なら中断する（ripgrepプロセスもこの場で終了させる）
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        cancel_event = SearchCancelEvent()
+        self._cancel_event = cancel_event
+        
+        # 検索実行（別スレッドで読み取り、キュー経由でイベントループに渡す）
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        
+        from .tui_main import SearchResult as UISearchResult
+        
+        query_lower = query.lower()
+        literal_match = not options.use_regex and not options.case_sensitive
+        
+        def produce() -> None:
+            # スコア計算とUI用の結果への変換も検索スレッドで行い、
+            # イベントループではキューから受け取って返すだけにする
+            # （同じファイルの同じ内容の行（import文など）はスコアを使い回す）
+            score_cache: Dict[Tuple[str, str], int] = {}
+            try:
+                for result in self._search_sync(query, self.search_path, options, cancel_event):
+                    key = (result.file_path, result.line_content)
+                    score = score_cache.get(key)
+                    if score is None:
+                        score = score_cache[key] = self._calculate_score(result, query_lower, literal_match)
+                    ui_result = UISearchResult(
+                        file_path=result.file_path,
+                        line_number=result.line_number,
+                        content=result.line_content,
+                        score=score
+                    )
+                    loop.call_soon_threadsafe(queue.put_nowait, ui_result)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, _SEARCH_DONE)
+                
+        producer = loop.run_in_executor(self._executor, produce)
         
-        # UI用の結果に変換
-        ui_results = []
-        for result in results:
-            # スコアを計算
-            score = self._calculate_score(result, query)
+        try:
+            while True:
+                result = await queue.get()
+                # 後から始まった検索に置き換えられた場合は打ち切る
+                if result is _SEARCH_DONE or cancel_event.is_set():
+                    break
+                yield result
+        finally:
+            # 途中で読み取りをやめた場合もripgrepを止める
+            cancel_event.set()
             
-            ui_result = UISearchResult(
-                file_path=result.file_path,
-                line_number=result.line_number,
-                content=result.line_content,
-                score=score
-            )
-            ui_results.append(ui_result)
+        if result is not _SEARCH_DONE:
+            # 置き換えられた検索はスレッドの終了を待たずに終える
+            return
+        await producer
             
         # セマンティック検索が有効な場合
         if self.enable_semantic and self._semantic_available:
-            semantic_results = await self._perform_semantic_search(query)
-            ui_results.extend(semantic_results)
-            
-        # スコアでソート
-        ui_results.sort(key=lambda x: x.score, reverse=True)
-            
-        return ui_results
+            for semantic_result in await self._perform_semantic_search(query):
+                yield semantic_result
         
-    def _search_sync(self, query: str, path: Path, options: SearchOptions) -> List[SearchResult]:
-        """同期的に検索を実行"""
-        results = []
+    def _search_sync(
+        self,
+        query: str,
+        path: Path,
+        options: SearchOptions,
+        cancel_event: Optional[SearchCancelEvent] = None
+    ) -> Iterator[SearchResult]:
+        """同期的に検索を実行して結果を1件ずつ返す（cancel_eventがセットされたら中断）"""
+        search_results = self.ripgrep.search(query, path, options, cancel_event)
         try:
-            for result in self.ripgrep.search(query, path, options):
-                results.append(result)
+            for result in search_results:
+                if cancel_event is not None and cancel_event.is_set():
+                    return
+                yield result
         except Exception as e:
             # エラーハンドリング
             from ..core.errors import ErrorHandler
             error_msg = ErrorHandler.handle_search_error(e)
             # TODO: エラーメッセージをUIに表示
+        finally:
+            # 中断時はジェネレータを閉じてripgrepプロセスを終了させる
+            search_results.close()
             
-        return results
+    def _calculate_score(self, result: SearchResult, query_lower: str, literal_match: bool = False) -> int:
+        """
+        検索結果のスコアを計算（1-5の星）
         
-    def _calculate_score(self, result: SearchResult, query: str) -> int:
-        """検索結果のスコアを計算（1-5の星）"""
+        Args:
+            result: 検索結果
+            query_lower: 小文字化済みの検索クエリ（検索ごとに1回だけ変換する）
+            literal_match: 大文字小文字無視のリテラル検索でヒットした行か
+                （その場合は行がクエリを含むことが分かっているので照合を省く）
+        """
         # 簡易的なスコア計算
-        line_lower = result.line_content.lower()
-        query_lower = query.lower()
+        # 完全一致ならファイル名も考慮、部分一致は2
+        if literal_match or query_lower in result.line_content.lower():
+            return self._path_bonus_for(result.file_path)
+        return 2
         
-        # 完全一致
-        if query_lower in line_lower:
-            # ファイル名も考慮
-            if 'readme' in result.file_path.lower():
-                return 5
-            elif any(ext in result.file_path for ext in ['.md', '.rst', '.txt']):
-                return 4
+    def _path_bonus_for(self, file_path: str) -> int:
+        """完全一致時のファイル名によるスコア（パスごとに1回だけ判定して記憶）"""
+        bonus = self._path_bonus.get(file_path)
+        if bonus is None:
+            if _README_RE.search(file_path):
+                bonus = 5
+            elif _EXT_RE.search(file_path):
+                bonus = 4
             else:
-                return 3
-        else:
-            # 部分一致
-            return 2
+                bonus = 3
+            self._path_bonus[file_path] = bonus
+        return bonus
             
+    def close(self) -> None:
+        """実行中の検索を中断して専用スレッドプールを終了"""
+        if self._cancel_event is not None:
+            self._cancel_event.set()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        
     def update_search_path(self, path: Path):
         """検索パスを更新"""
         self.search_path = path
+        self.ripgrep.clear_file_cache()
+        self._path_bonus.clear()
         
     def _check_semantic_available(self) -> bool:
         """セマンティック検索が利用可能かチェック"""
@@ -123,46 +232,46 @@ class SearchIntegration:
             logging.warning("sentence-transformersが見つかりません。セマンティック検索は無効です。")
             return False
             
-    async def _perform_semantic_search(self, query: str) -> List[UISearchResult]:
+    async def _perform_semantic_search(self, query: str) -> List["UISearchResult"]:
         """セマンティック検索を実行"""
+        from .tui_main import SearchResult as UISearchResult
+        
         if self._semantic_engine is None:
             self._semantic_engine = SemanticSearchEngine()
-            # インデックス構築（初回のみ）
-            await self._build_semantic_index()
+            # インデックス構築（初回のみ。失敗したら次の検索で作り直す）
+            try:
+                await self._build_semantic_index()
+            except Exception:
+                self._semantic_engine = None
+                raise
             
-        # セマンティック検索実行
-        semantic_results = self._semantic_engine.search(query, top_k=5)
+        # セマンティック検索実行（クエリの埋め込みはモデル推論なので別スレッドで）
+        loop = asyncio.get_running_loop()
+        semantic_results = await loop.run_in_executor(
+            self._executor,
+            partial(self._semantic_engine.search, query, top_k=5)
+        )
         
         # UI用に変換
-        ui_results = []
-        for result in semantic_results:
-            ui_result = UISearchResult(
+        return [
+            UISearchResult(
                 file_path=result.file_path,
                 line_number=0,  # セマンティック検索では行番号なし
                 content=f"[Semantic] {result.content[:100]}...",
                 score=int(result.similarity_score * 5)  # 0-1を1-5に変換
             )
-            ui_results.append(ui_result)
-            
-        return ui_results
+            for result in semantic_results
+        ]
         
     async def _build_semantic_index(self):
         """セマンティック検索用のインデックスを構築"""
-        documents = []
-        
-        # MarkdownとPythonファイルを収集
-        for pattern in ['**/*.md', '**/*.py', '**/*.txt']:
-            for file_path in self.search_path.glob(pattern):
-                try:
-                    content = file_path.read_text(encoding='utf-8', errors='ignore')
-                    documents.append((str(file_path), content))
-                except Exception:
-                    pass
-                    
-        # インデックス構築（非同期実行）
-        loop = asyncio.get_event_loop()
+        # MarkdownとPythonファイルを収集（走査と読み込みは別スレッドで）
+        loop = asyncio.get_running_loop()
+        paths = await loop.run_in_executor(self._executor, list, iter_files(self.search_path))
+        
+        # インデックス構築（非同期実行、ファイルは並列に先読みしながら1つずつ処理）
         await loop.run_in_executor(
-            None,
+            self._executor,
             self._semantic_engine.build_index,
-            documents
+            iter_documents(paths)
         )
\ No newline at end of file
@@ -8,9 +8,11 @@ from textual.containers import Container, Horizontal, Vertical, ScrollableContai
 from textual.widgets import Header, Footer, Input, Static, Label, Button
 from textual.binding import Binding
 from textual import events
+from textual.timer import Timer
 from rich.text import Text
 from rich.panel import Panel
 import asyncio
+import time
 from typing import Optional, List, Dict, Any
 
 
@@ -20,16 +22,6 @@ class StarryBackground(Static):
     def __init__(self) -> None:
         super().__init__()
         self.stars = ["✨", "⭐", "🌟", "💫", "✦", "✧"]
-        self.frame = 0
-        
-    def on_mount(self) -> None:
-        """マウント時にアニメーション開始"""
-        self.set_interval(0.5, self.animate_stars)
-        
-    def animate_stars(self) -> None:
-        """星のアニメーション更新"""
-        self.frame += 1
-        # TODO: 星空アニメーション実装
 
 
 class SearchInput(Input):
@@ -42,27 +34,60 @@ class SearchInput(Input):
         )
 
 
+# スコア（0-5）ごとの星評価の表示文字列
+_STAR_STRINGS = tuple("★" * i + "☆" * (5 - i) for i in range(6))
+
+
+def _render_field(name: str) -> property:
+    """変更されたら描画キャッシュを破棄する属性を作成"""
+    attr = f"_{name}"
+    
+    def getter(self: "SearchResult") -> Any:
+        return getattr(self, attr)
+        
+    def setter(self: "SearchResult", value: Any) -> None:
+        setattr(self, attr, value)
+        self._cached_panel = None
+        # 表示中なら描き直す（内容の行数が変わることもあるのでレイアウトも更新）
+        if self.is_mounted:
+            self.refresh(layout=True)
+        
+    return property(getter, setter)
+
+
 class SearchResult(Static):
     """検索結果アイテム"""
     
+    file_path = _render_field("file_path")
+    line_number = _render_field("line_number")
+    content = _render_field("content")
+    score = _render_field("score")
+    
     def __init__(self, file_path: str, line_number: int, content: str, score: int = 5) -> None:
         super().__init__()
+        self._cached_panel: Optional[Panel] = None
         self.file_path = file_path
         self.line_number = line_number
         self.content = content
         self.score = score
         
     def render(self) -> Panel:
-        """検索結果を星評価付きで表示"""
-        stars = "★" * self.score + "☆" * (5 - self.score)
+        """検索結果を星評価付きで表示（表示内容が変わるまで再描画でも使い回す）"""
+        if self._cached_panel is not None:
+            return self._cached_panel
+            
+        stars = _STAR_STRINGS[min(max(self.score, 0), 5)]
         
-        content = Text()
-        content.append(f"📄 {self.file_path}", style="bold cyan")
-        content.append(f"  {stars}\n", style="yellow")
-        content.append(f"  L{self.line_number}: ", style="dim")
-        content.append(self.content.strip(), style="white")
+        # マークアップを使わずに組み立てる（パスや本文の [ ] をエスケープする必要もない）
+        content = Text.assemble(
+            (f"📄 {self.file_path}", "bold cyan"),
+            (f"  {stars}\n", "yellow"),
+            (f"  L{self.line_number}: ", "dim"),
+            (self.content.strip(), "white"),
+        )
         
-        return Panel(content, border_style="blue")
+        self._cached_panel = Panel(content, border_style="blue")
+        return self._cached_panel
 
 
 class SearchResultsContainer(ScrollableContainer):
@@ -77,22 +102,31 @@ class SearchResultsContainer(ScrollableContainer):
         self.results.append(result)
         self.mount(result)
         
+    def add_results(self, results: List[SearchResult]) -> None:
+        """複数の検索結果をまとめて追加（1回のマウントで再レイアウトも1回）"""
+        self.results.extend(results)
+        self.mount_all(results)
+        
     def clear_results(self) -> None:
-        """検索結果をクリア"""
-        for widget in self.results:
-            widget.remove()
+        """検索結果をクリア（子ウィジェットを1回でまとめて削除）"""
+        self.remove_children()
         self.results.clear()
 
 
 class StatusBar(Static):
     """ステータスバー"""
     
+    # 再描画の最短間隔（秒）。これより短い間隔の更新はまとめて1回で描画する
+    REFRESH_INTERVAL = 0.05
+    
     def __init__(self) -> None:
         super().__init__(id="status-bar")
         self.status = "Ready"
         self.speed = "0.00s"
         self.files = 0
         self.matches = 0
+        self._last_refresh = 0.0
+        self._refresh_pending = False
         
     def render(self) -> str:
         """ステータス情報を表示"""
@@ -105,21 +139,48 @@ class StatusBar(Static):
         
     def update_status(self, status: str = None, speed: str = None, 
                      files: int = None, matches: int = None) -> None:
-        """ステータスを更新"""
-        if status is not None:
+        """ステータスを更新（値が変わったときだけ再描画）"""
+        dirty = False
+        if status is not None and status != self.status:
             self.status = status
-        if speed is not None:
+            dirty = True
+        if speed is not None and speed != self.speed:
             self.speed = speed
-        if files is not None:
+            dirty = True
+        if files is not None and files != self.files:
             self.files = files
-        if matches is not None:
+            dirty = True
+        if matches is not None and matches != self.matches:
             self.matches = matches
+            dirty = True
+        if dirty:
+            self._throttled_refresh()
+            
+    def _throttled_refresh(self) -> None:
+        """再描画を間引く（間引いた分は最後にまとめて1回描画する）"""
+        if self._refresh_pending:
+            return
+        elapsed = time.monotonic() - self._last_refresh
+        if elapsed >= self.REFRESH_INTERVAL:
+            self._flush_refresh()
+        else:
+            self._refresh_pending = True
+            self.set_timer(self.REFRESH_INTERVAL - elapsed, self._flush_refresh)
+            
+    def _flush_refresh(self) -> None:
+        """保留中の更新を描画"""
+        self._refresh_pending = False
+        self._last_refresh = time.monotonic()
         self.refresh()
 
 
 class DocSearchApp(App):
     """doc-search メインアプリケーション"""
     
+    # 検索結果をまとめてマウントする件数と間隔（秒）
+    MOUNT_BATCH_SIZE = 16
+    MOUNT_INTERVAL = 0.033
+    
     CSS = """
     Screen {
         background: #0a0e27;
@@ -171,6 +232,12 @@ class DocSearchApp(App):
         self.search_input: Optional[SearchInput] = None
         self.results_container: Optional[SearchResultsContainer] = None
         self.status_bar: Optional[StatusBar] = None
+        # 実行中の検索タスク（新しい検索が始まったら中断する）
+        self._search_task: Optional[asyncio.Task] = None
+        # 実行中の検索の結果を一定間隔で表示するタイマー（中断時にその場で止める）
+        self._flush_timer: Optional[Timer] = None
+        # 検索を始めるたびに増やす番号（古い検索の結果を表示しないための目印）
+        self._search_generation = 0
         
     def compose(self) -> ComposeResult:
         """UIコンポーネントを構成"""
@@ -189,6 +256,14 @@ class DocSearchApp(App):
         # 起動時アニメーション
         self.show_startup_animation()
         
+    def on_unmount(self) -> None:
+        """終了時に検索用のスレッドプールを片付ける"""
+        if self._search_task is not None:
+            self._search_task.cancel()
+        self._stop_flush_timer()
+        if hasattr(self, 'search_integration'):
+            self.search_integration.close()
+            
     def show_startup_animation(self) -> None:
         """起動時の星座アニメーション"""
         # TODO: 起動アニメーション実装
@@ -200,39 +275,73 @@ class DocSearchApp(App):
         if not query:
             return
             
+        # 前の検索が終わっていなければ中断（古い結果がマウントされないように）
+        # タスクのキャンセルは次にタスクが再開したときに届くので、
+        # 結果を表示するタイマーはここで止めておく
+        if self._search_task is not None and not self._search_task.done():
+            self._search_task.cancel()
+        self._stop_flush_timer()
+            
         # ステータス更新
         self.status_bar.update_status(status="Searching...")
         
         # 検索結果をクリア
         self.results_container.clear_results()
         
-        # TODO: 実際の検索処理を実装
-        # 仮の検索結果を表示
-        await self.perform_search(query)
+        # 検索はタスクとして実行し、検索中も次の入力を受け付ける
+        self._search_generation += 1
+        self._search_task = asyncio.create_task(self.perform_search(query))
+        
+    def _stop_flush_timer(self) -> None:
+        """実行中の検索の結果表示タイマーを止める"""
+        if self._flush_timer is not None:
+            self._flush_timer.stop()
+            self._flush_timer = None
         
     async def perform_search(self, query: str) -> None:
         """検索を実行（ripgrep統合版）"""
-        import time
         from .search_integration import SearchIntegration
         
         if not hasattr(self, 'search_integration'):
             self.search_integration = SearchIntegration()
         
         start_time = time.time()
+        generation = self._search_generation
         
         try:
-            # 実際の検索を実行
-            results = await self.search_integration.perform_search(
-                query,
-                use_regex=True,  # TODO: UIから制御
-                file_types=None,  # TODO: UIから制御
-                max_results=100
-            )
+            # 実際の検索を実行（見つかった結果から順に、件数か時間の区切りでまとめて表示）
+            match_count = 0
+            batch: List[SearchResult] = []
             
-            # 結果を表示
-            for result in results:
-                self.results_container.add_result(result)
-                await asyncio.sleep(0.01)  # スムーズなアニメーション
+            def flush() -> None:
+                nonlocal batch, match_count
+                # 後から始まった検索に置き換えられていたら何も表示しない
+                if generation != self._search_generation:
+                    return
+                if batch and self.results_container is not None:
+                    self.results_container.add_results(batch)
+                    match_count += len(batch)
+                    batch = []
+                    
+            # 結果がまばらでも、次の結果を待たずに一定間隔でたまった分を表示する
+            self._flush_timer = flush_timer = self.set_interval(self.MOUNT_INTERVAL, flush)
+            try:
+                async for result in self.search_integration.stream_search(
+                    query,
+                    use_regex=True,  # TODO: UIから制御
+                    file_types=None,  # TODO: UIから制御
+                    max_results=100
+                ):
+                    batch.append(result)
+                    if len(batch) >= self.MOUNT_BATCH_SIZE:
+                        flush()
+                        # バッチの区切りでだけ描画の機会を譲る
+                        await asyncio.sleep(0)
+                flush()
+            finally:
+                flush_timer.stop()
+                if self._flush_timer is flush_timer:
+                    self._flush_timer = None
                 
             # ステータス更新
             elapsed = time.time() - start_time
@@ -240,7 +349,7 @@ class DocSearchApp(App):
                 status="Ready",
                 speed=f"{elapsed:.2f}s",
                 files=523,  # TODO: 実際のファイル数
-                matches=len(results)
+                matches=match_count
             )
         except Exception as e:
             # エラー時の処理
@@ -36,4 +36,532 @@ def test_python_fallback_search(tmp_path):
     results = list(wrapper._search_with_python("test", tmp_path, options))
     
     assert len(results) > 0
-    assert any("test" in r.line_content.lower() for r in results)
\ No newline at end of file
+    assert any("test" in r.line_content.lower() for r in results)
+
+class _FakeEmbeddingModel:
+    """文字の出現頻度を埋め込みとして返すテスト用モデル"""
+
+    def encode(self, text, **kwargs):
+        import numpy as np
+        if not isinstance(text, str):
+            return np.stack([self.encode(t) for t in text])
+        vec = np.zeros(26, dtype=np.float32)
+        for char in text.lower():
+            if 'a' <= char <= 'z':
+                vec[ord(char) - ord('a')] += 1
+        return vec
+
+
+class _CountingEmbeddingModel(_FakeEmbeddingModel):
+    """バッチで埋め込んだテキストを記録するテスト用モデル"""
+
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, text, **kwargs):
+        if not isinstance(text, str):
+            self.encoded.extend(text)
+        return super().encode(text, **kwargs)
+
+
+def test_semantic_search_ranking(tmp_path):
+    """セマンティック検索の類似度順ランキングテスト"""
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine._model = _FakeEmbeddingModel()
+    engine.build_index([
+        ("a.md", "aaaa"),
+        ("b.md", "bbbb"),
+        ("ab.md", "aabb"),
+    ])
+
+    results = engine.search("aaaa", top_k=2, similarity_threshold=0.1)
+
+    assert [r.file_path for r in results] == ["a.md", "ab.md"]
+    assert results[0].similarity_score == pytest.approx(1.0)
+    assert results[0].similarity_score >= results[1].similarity_score
+
+
+def test_semantic_search_hnsw(tmp_path):
+    """HNSWインデックスを使ったセマンティック検索のテスト"""
+    pytest.importorskip("hnswlib")
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine.HNSW_MIN_ELEMENTS = 1
+    engine._model = _FakeEmbeddingModel()
+    engine.build_index([
+        ("a.md", "aaaa"),
+        ("b.md", "bbbb"),
+        ("ab.md", "aabb"),
+    ])
+    assert engine._hnsw_index is not None
+
+    results = engine.search("aaaa", top_k=2, similarity_threshold=0.1)
+    assert [r.file_path for r in results] == ["a.md", "ab.md"]
+
+    # 保存したインデックスを再読み込みして検索できる
+    reloaded = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    reloaded._model = _FakeEmbeddingModel()
+    results = reloaded.search("bbbb", top_k=1, similarity_threshold=0.1)
+    assert [r.file_path for r in results] == ["b.md"]
+
+
+def test_iter_documents(tmp_path):
+    """並列ファイル読み込み（先読み件数の上限付き）のテスト"""
+    from doc_search.core.file_collector import iter_documents
+
+    (tmp_path / "a.md").write_text("alpha")
+    (tmp_path / "b.txt").write_text("beta")
+
+    paths = [tmp_path / "a.md", tmp_path / "b.txt", tmp_path / "missing.md"]
+    assert list(iter_documents(paths)) == [
+        (str(tmp_path / "a.md"), "alpha"), (str(tmp_path / "b.txt"), "beta")
+    ]
+
+    # 先読みはスレッド数の2倍までで、残りのパスはまだ取り出さない
+    for i in range(20):
+        (tmp_path / f"doc{i}.md").write_text(f"doc {i}")
+    consumed = []
+
+    def generate_paths():
+        for i in range(20):
+            consumed.append(i)
+            yield tmp_path / f"doc{i}.md"
+
+    documents = iter_documents(generate_paths(), max_workers=2)
+    assert next(documents) == (str(tmp_path / "doc0.md"), "doc 0")
+    assert len(consumed) == 4
+    assert [content for _, content in documents] == [f"doc {i}" for i in range(1, 20)]
+
+
+def test_semantic_index_persistence(tmp_path):
+    """埋め込み行列の保存と差分更新のテスト"""
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine._model = _CountingEmbeddingModel()
+    engine.build_index([("a.md", "aaaa"), ("b.md", "bbbb")])
+    assert (tmp_path / "cache" / "embeddings.npy").exists()
+    assert (tmp_path / "cache" / "keys.json").exists()
+
+    # 再起動後は変更されたチャンクだけを埋め込む
+    reloaded = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    reloaded._model = _CountingEmbeddingModel()
+    assert len(reloaded._keys) == 2
+    reloaded.build_index([("a.md", "aaaa"), ("b.md", "bbbc")])
+    assert reloaded._model.encoded == ["bbbc"]
+
+    results = reloaded.search("bbbc", top_k=1, similarity_threshold=0.1)
+    assert [r.file_path for r in results] == ["b.md"]
+
+    # ファイル名が変わっても内容が同じなら再利用する
+    renamed = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    renamed._model = _CountingEmbeddingModel()
+    renamed.build_index([("docs/a.md", "aaaa"), ("b.md", "bbbc")])
+    assert renamed._model.encoded == []
+
+
+def test_iter_files_single_walk(tmp_path):
+    """拡張子によるファイル列挙のテスト"""
+    from doc_search.core.file_collector import iter_files
+
+    (tmp_path / "docs").mkdir()
+    (tmp_path / "docs" / "guide.md").write_text("guide")
+    (tmp_path / "main.py").write_text("print()")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG")
+
+    found = sorted(p.relative_to(tmp_path).as_posix() for p in iter_files(tmp_path))
+    assert found == ["docs/guide.md", "main.py"]
+
+    found = [p.name for p in iter_files(tmp_path, ('.md',))]
+    assert found == ["guide.md"]
+
+
+def test_iter_files_skips_ignored(tmp_path):
+    """除外ディレクトリ・.gitignore・巨大ファイルを飛ばすテスト"""
+    from doc_search.core.file_collector import iter_files
+
+    (tmp_path / ".gitignore").write_text("generated/\n*.log.md\n")
+    for directory in ["node_modules", "generated", "docs"]:
+        (tmp_path / directory).mkdir()
+        (tmp_path / directory / "notes.md").write_text("notes")
+    (tmp_path / "debug.log.md").write_text("log")
+    (tmp_path / "huge.md").write_text("x" * 200)
+
+    found = sorted(p.relative_to(tmp_path).as_posix() for p in iter_files(tmp_path, max_file_size=100))
+    assert found == ["docs/notes.md"]
+
+
+def test_python_fallback_regex_search(tmp_path):
+    """Pythonフォールバックの正規表現検索テスト（RE2非対応の構文を含む）"""
+    (tmp_path / "notes.md").write_text("Hello hello\naa bb\n")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+    options = SearchOptions(use_regex=True, case_sensitive=False)
+
+    results = list(wrapper._search_with_python("hel+o", tmp_path, options))
+    assert [(r.line_number, r.match_start, r.match_end) for r in results] == [
+        (1, 0, 5), (1, 6, 11)
+    ]
+
+    # 後方参照はRE2では扱えないので標準のreで検索される
+    results = list(wrapper._search_with_python(r"(\w)\1", tmp_path, options))
+    assert [(r.line_number, r.match_start) for r in results] == [(1, 2), (1, 8), (2, 0), (2, 3)]
+
+
+def test_ripgrep_json_output_parsing(monkeypatch, tmp_path):
+    """ripgrepのJSON出力の解析テスト（UTF-8でないパスはbase64で出力される）"""
+    import base64
+    import io
+    import json
+    from doc_search.core import ripgrep_wrapper
+
+    raw_path = base64.b64encode(b"docs/caf\xe9.md").decode()
+    lines = [
+        {"type": "begin", "data": {"path": {"bytes": raw_path}}},
+        {"type": "context", "data": {"path": {"bytes": raw_path}, "lines": {"text": "intro\n"}, "line_number": 1}},
+        {"type": "match", "data": {
+            "path": {"bytes": raw_path}, "lines": {"text": "★ star and star\n"}, "line_number": 2,
+            "submatches": [{"match": {"text": "star"}, "start": 4, "end": 8},
+                           {"match": {"text": "star"}, "start": 13, "end": 17}],
+        }},
+        {"type": "end", "data": {"path": {"bytes": raw_path}}},
+    ]
+    output = "".join(json.dumps(line, separators=(",", ":")) + "\n" for line in lines).encode()
+
+    class _FakeProcess:
+        def __init__(self, cmd, **kwargs):
+            self.stdout = io.BytesIO(output)
+
+        def poll(self):
+            return 0
+
+        def wait(self):
+            return 0
+
+    monkeypatch.setattr(ripgrep_wrapper.subprocess, "Popen", _FakeProcess)
+
+    wrapper = RipgrepWrapper()
+    results = list(wrapper._search_with_ripgrep("star", tmp_path, SearchOptions()))
+    assert [(r.file_path, r.line_number, r.line_content, r.match_start) for r in results] == [
+        ("docs/caf\ufffd.md", 2, "★ star and star", 2),
+        ("docs/caf\ufffd.md", 2, "★ star and star", 11),
+    ]
+    # ripgrepのバイト位置は文字位置に直される
+    assert {r.line_content[r.match_start:r.match_end] for r in results} == {"star"}
+
+def test_ripgrep_cancel_kills_process(monkeypatch, tmp_path):
+    """中断するとripgrepの出力を待っている検索スレッドもすぐに終わることのテスト"""
+    import threading
+    import time
+    from doc_search.core import ripgrep_wrapper
+    from doc_search.core.ripgrep_wrapper import SearchCancelEvent
+
+    started = threading.Event()
+
+    class _BlockingProcess:
+        # 終了させられるまで出力を返さないripgrep
+        def __init__(self, cmd, **kwargs):
+            self.killed = threading.Event()
+            self.stdout = self
+            started.set()
+
+        def readline(self):
+            self.killed.wait(5)
+            return b""
+
+        def close(self):
+            pass
+
+        def poll(self):
+            return 0 if self.killed.is_set() else None
+
+        def kill(self):
+            self.killed.set()
+
+        def wait(self):
+            return 0
+
+    monkeypatch.setattr(ripgrep_wrapper.subprocess, "Popen", _BlockingProcess)
+
+    wrapper = RipgrepWrapper()
+    cancel_event = SearchCancelEvent()
+    results = []
+    worker = threading.Thread(target=lambda: results.extend(
+        wrapper._search_with_ripgrep("star", tmp_path, SearchOptions(), cancel_event)
+    ))
+    worker.start()
+    assert started.wait(5)
+    start = time.monotonic()
+    cancel_event.set()
+    worker.join(5)
+    assert not worker.is_alive()
+    assert time.monotonic() - start < 1
+    assert results == []
+
+
+def test_python_fallback_matches_within_lines(tmp_path, regex_engine):
+    """Pythonフォールバックの一致が行をまたがず、文字単位の位置で返ることのテスト（RE2の有無どちらでも）"""
+    (tmp_path / "notes.md").write_text('foo\nbar\n"a\nb" "c"\n全文検索エンジン\n', encoding="utf-8")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+
+    def found(query, **kwargs):
+        options = SearchOptions(**kwargs)
+        return [
+            (r.line_number, r.line_content[r.match_start:r.match_end])
+            for r in wrapper._search_with_python(query, tmp_path, options)
+        ]
+
+    assert found(r"foo\sbar", use_regex=True, case_sensitive=False) == []
+    assert found(r'"[^"]*"', use_regex=True, case_sensitive=False) == [(4, '" "')]
+
+    # . や文字クラスがマルチバイト文字の途中に一致せず、切り出した文字列が一致した部分になる
+    for case_sensitive in (True, False):
+        assert found("[検索]エンジン", use_regex=True, case_sensitive=case_sensitive) == [(5, "索エンジン")]
+        assert found("検索", use_regex=False, case_sensitive=case_sensitive) == [(5, "検索")]
+
+
+def test_python_fallback_searches_large_files(tmp_path):
+    """インデックス用のサイズ制限を超えるファイルもフォールバック検索の対象になるテスト"""
+    from doc_search.core.file_collector import MAX_FILE_SIZE
+
+    (tmp_path / "server.txt").write_bytes(b"x" * MAX_FILE_SIZE + b"\nerror: disk full\n")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+    options = SearchOptions(use_regex=False, case_sensitive=False)
+
+    results = list(wrapper._search_with_python("disk full", tmp_path, options))
+    assert [(r.line_number, r.line_content) for r in results] == [(2, "error: disk full")]
+
+def test_python_fallback_file_list_refresh(tmp_path, caplog):
+    """ファイル一覧キャッシュが期限切れやファイル削除で取り直されるテスト"""
+    (tmp_path / "a.md").write_text("needle\n")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+    options = SearchOptions(use_regex=False)
+
+    def found():
+        return sorted(Path(r.file_path).name for r in wrapper._search_with_python("needle", tmp_path, options))
+
+    assert found() == ["a.md"]
+
+    # 削除されたファイルは警告を出さずに飛ばし、次の検索で一覧を取り直す
+    (tmp_path / "a.md").unlink()
+    (tmp_path / "b.md").write_text("needle\n")
+    assert found() == []
+    assert "ファイル読み込みエラー" not in caplog.text
+    assert found() == ["b.md"]
+
+    # 有効期間が過ぎると新しいファイルも検索対象になる
+    (tmp_path / "c.md").write_text("needle\n")
+    wrapper.FILE_LIST_TTL = 0
+    assert found() == ["b.md", "c.md"]
+
+def test_python_fallback_reuses_compiled_pattern(tmp_path):
+    """同じクエリの繰り返し検索でコンパイル済みパターンを使い回すテスト"""
+    from doc_search.core.ripgrep_wrapper import _compile
+
+    for name in ("a.md", "b.md", "c.md"):
+        (tmp_path / name).write_text("needle\n")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+    options = SearchOptions(use_regex=True, case_sensitive=False)
+
+    _compile.cache_clear()
+    assert len(list(wrapper._search_with_python("nee+dle", tmp_path, options))) == 3
+    first = _compile.cache_info()
+    for _ in range(2):
+        assert len(list(wrapper._search_with_python("nee+dle", tmp_path, options))) == 3
+
+    info = _compile.cache_info()
+    assert info.misses == first.misses
+    assert info.hits == first.hits + 2 * first.misses
+
+
+def test_semantic_index_model_change(tmp_path, monkeypatch):
+    """別のモデルで作ったインデックスの埋め込みを再利用しないことのテスト"""
+    import json
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine._model = _FakeEmbeddingModel()
+    engine.build_index([("a.md", "aaaa"), ("b.md", "bbbb")])
+    meta = json.loads((tmp_path / "cache" / "index_meta.json").read_text())
+    assert meta == {"model": "local:all-MiniLM-L6-v2", "dim": 26}
+
+    # OpenAIに切り替えると保存済みの行列は読み込まずにすべて埋め込み直す
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    switched = SemanticSearchEngine(cache_dir=tmp_path / "cache", use_openai=True)
+    assert switched._matrix is None
+    assert switched._keys == []
+
+    # モデルの記録がない古い形式のインデックスも読み込まない
+    (tmp_path / "cache" / "index_meta.json").unlink()
+    monkeypatch.delenv("OPENAI_API_KEY")
+    legacy = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    legacy._model = _CountingEmbeddingModel()
+    assert legacy._keys == []
+    legacy.build_index([("a.md", "aaaa"), ("b.md", "bbbb")])
+    assert sorted(legacy._model.encoded) == ["aaaa", "bbbb"]
+    assert (tmp_path / "cache" / "index_meta.json").exists()
+
+
+def test_semantic_index_deduplicates_chunks(tmp_path):
+    """同じ内容のチャンクを一度だけ埋め込むテスト"""
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine._model = _CountingEmbeddingModel()
+    engine.INDEX_BATCH_SIZE = 1
+    documents = [("a.md", "license"), ("b.md", "license"), ("c.md", "other")]
+    engine.build_index(doc for doc in documents)
+
+    assert sorted(engine._model.encoded) == ["license", "other"]
+    assert len(engine._keys) == 3
+
+
+def test_semantic_openai_error_does_not_mix_models(tmp_path):
+    """OpenAIの一部のバッチが失敗しても別モデルの埋め込みを混ぜないことのテスト"""
+    from types import SimpleNamespace
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    class _FlakyOpenAI:
+        def __init__(self):
+            self.calls = 0
+            self.embeddings = self
+
+        def create(self, model, input):
+            self.calls += 1
+            if self.calls > 1:
+                raise RuntimeError("rate limited")
+            return SimpleNamespace(data=[SimpleNamespace(embedding=[1.0] * 1536) for _ in input])
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache", use_openai=True)
+    engine.openai_api_key = "test"
+    engine._openai_client = _FlakyOpenAI()
+    engine._model = _FakeEmbeddingModel()
+    engine.OPENAI_BATCH_SIZE = 1
+
+    with pytest.raises(RuntimeError):
+        engine.build_index([("a.md", "aaaa"), ("b.md", "bbbb")])
+    assert engine._matrix is None
+    assert not (tmp_path / "cache" / "embeddings.npy").exists()
+
+
+def test_semantic_query_cache_threads(tmp_path):
+    """複数スレッドから検索してもクエリ埋め込みのキャッシュが壊れないことのテスト"""
+    from concurrent.futures import ThreadPoolExecutor
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    engine._model = _FakeEmbeddingModel()
+    engine.QUERY_CACHE_SIZE = 8
+    engine.build_index([("a.md", "aaaa"), ("b.md", "bbbb")])
+
+    queries = [f"{'a' * (i % 16 + 1)}b" for i in range(2000)]
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        results = list(executor.map(
+            lambda query: engine.search(query, top_k=1, similarity_threshold=0.1), queries
+        ))
+
+    assert all([r.file_path for r in hits] == ["a.md"] for hits in results)
+    assert len(engine._query_embed_cache) <= engine.QUERY_CACHE_SIZE
+
+
+def test_split_into_chunks(tmp_path):
+    """チャンク分割が行単位で元の文字列を保つことのテスト"""
+    from doc_search.core.semantic_search import SemanticSearchEngine
+
+    engine = SemanticSearchEngine(cache_dir=tmp_path / "cache")
+    content = "aaaa\nbbbb\n\ncccc\ndd"
+
+    assert engine._split_into_chunks(content, chunk_size=8) == ["aaaa\nbbbb\n", "cccc\ndd"]
+    assert engine._split_into_chunks(content, chunk_size=100) == [content]
+    assert engine._split_into_chunks("", chunk_size=8) == [""]
+
+
+def test_calculate_score(tmp_path):
+    """検索結果のスコア計算テスト"""
+    from doc_search.core.ripgrep_wrapper import SearchResult
+    from doc_search.ui.search_integration import SearchIntegration
+
+    integration = SearchIntegration(search_path=tmp_path, enable_semantic=False)
+
+    def score(file_path, line):
+        result = SearchResult(file_path, 1, line, 0, 0)
+        return integration._calculate_score(result, "star")
+
+    assert score("docs/README.md", "Star finder") == 5
+    assert score("docs/Guide.MD", "Star finder") == 4
+    assert score("src/main.py", "Star finder") == 3
+    assert score("docs/README.md", "st.r finder") == 2
+    assert integration._path_bonus == {"docs/README.md": 5, "docs/Guide.MD": 4, "src/main.py": 3}
+
+    # リテラル検索でヒットした行は照合を省いてファイル名だけで決まる
+    literal = SearchResult("docs/README.md", 1, "STAR", 0, 4)
+    assert integration._calculate_score(literal, "star", literal_match=True) == 5
+
+
+@pytest.fixture(params=["re2", "re"])
+def regex_engine(request, monkeypatch):
+    """google-re2がある場合とない場合の両方で実行するためのフィクスチャ"""
+    from doc_search.core import ripgrep_wrapper
+
+    if request.param == "re2":
+        pytest.importorskip("re2")
+    else:
+        monkeypatch.setattr(ripgrep_wrapper, "re2", None)
+    ripgrep_wrapper._compile.cache_clear()
+    yield request.param
+    ripgrep_wrapper._compile.cache_clear()
+
+
+def test_python_fallback_ascii_case_folding(tmp_path, regex_engine):
+    """ASCIIの大文字小文字判定がRE2の有無で変わらないことのテスト"""
+    (tmp_path / "summer.md").write_text("été Summer\n", encoding="utf-8")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+
+    for use_regex in (False, True):
+        options = SearchOptions(use_regex=use_regex, case_sensitive=False)
+        assert [r.line_number for r in wrapper._search_with_python("SUMMER", tmp_path, options)] == [1]
+        assert list(wrapper._search_with_python("ÉTÉ", tmp_path, options)) == []
+
+
+def test_python_fallback_unicode_case_folding(tmp_path):
+    """Pythonフォールバックの大文字小文字判定（ASCII/Unicode）のテスト"""
+    (tmp_path / "summer.md").write_text("ÉTÉ Summer\n", encoding="utf-8")
+
+    wrapper = RipgrepWrapper(fallback_to_python=True)
+
+    ascii_options = SearchOptions(use_regex=False, case_sensitive=False)
+    assert [r.line_number for r in wrapper._search_with_python("summer", tmp_path, ascii_options)] == [1]
+
+    unicode_options = SearchOptions(use_regex=False, case_sensitive=False, unicode=True)
+    results = list(wrapper._search_with_python("été", tmp_path, unicode_options))
+    assert [(r.line_number, r.match_start, r.match_end) for r in results] == [(1, 0, 3)]
+
+
+def test_stream_search(tmp_path):
+    """検索結果を逐次受け取れることのテスト"""
+    import asyncio
+    from doc_search.ui.search_integration import SearchIntegration
+
+    (tmp_path / "README.md").write_text("star one\nstar two\n")
+    (tmp_path / "main.py").write_text("# star three\n")
+
+    integration = SearchIntegration(search_path=tmp_path, enable_semantic=False)
+
+    async def collect():
+        return [r async for r in integration.stream_search("star", use_regex=False)]
+
+    results = asyncio.run(collect())
+    assert sorted((Path(r.file_path).name, r.line_number) for r in results) == [
+        ("README.md", 1), ("README.md", 2), ("main.py", 1)
+    ]
+
+    ranked = asyncio.run(integration.perform_search("star", use_regex=False))
+    assert [r.score for r in ranked] == [5, 5, 3]